@@ -2,7 +2,7 @@
 
 import asyncio
 import logging
-import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 
 logging.basicConfig(
@@ -71,9 +71,13 @@ class FalcataAnalyzer(App):
 
     TITLE = "Falcata Analyzer"
 
+    # Number of analyzed files kept in memory for instant re-selection.
+    FILE_CACHE_SIZE = 4
+
     def __init__(self):
         super().__init__()
         self._results = []
+        self._file_cache = OrderedDict()
 
     def compose(self):
         yield Header()
@@ -102,7 +106,25 @@ class FalcataAnalyzer(App):
         status = self.query_one("#status", Static)
         status.update(f"Analyzing {path.name}...")
 
-        self._load_results(lambda: analyze_file(path), path.name)
+        self._load_results(lambda: self._analyze_file_cached(path), path.name)
+
+    def _analyze_file_cached(self, path):
+        """analyze_file() memoized per path, so re-selecting a file skips the decode.
+
+        Only the results for the file's current mtime are kept (an edited file
+        replaces its old entry), and only for the FILE_CACHE_SIZE most recently
+        selected files.
+        """
+        key = str(path)
+        mtime_ns = path.stat().st_mtime_ns
+        cached = self._file_cache.get(key)
+        if cached is None or cached[0] != mtime_ns:
+            cached = (mtime_ns, analyze_file(path))
+            self._file_cache[key] = cached
+        self._file_cache.move_to_end(key)
+        while len(self._file_cache) > self.FILE_CACHE_SIZE:
+            self._file_cache.popitem(last=False)
+        return cached[1]
 
     async def action_fetch_firestore(self):
         log.info("action_fetch_firestore called")
@@ -181,19 +203,12 @@ class FalcataAnalyzer(App):
     def _plot_sprint(self, row_index):
         r = self._results[row_index]
         pd = r['plot_data']
-        t = pd['t']
-        rolling = pd['rolling']
 
         plot_widget = self.query_one("#plot", PlotextPlot)
         plt = plot_widget.plt
         plt.clear_figure()
 
-        # Filter out NaN values for plotting
-        valid = ~np.isnan(rolling)
-        t_valid = t[valid].tolist()
-        r_valid = rolling[valid].tolist()
-
-        plt.plot(t_valid, r_valid, label="Rolling mean")
+        plt.plot(pd['t_list'], pd['r_list'], label="Rolling mean")
         plt.hline(pd['threshold'], color="magenta")
         plt.vline(pd['fwd_time'], color="red")
         plt.vline(pd['bwd_time'], color="green")
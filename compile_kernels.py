@@ -0,0 +1,34 @@
+"""
+Ahead-of-time build of the detection kernel.
+
+Compiles detection._detect_scan into the `sprintzero_kernels` extension module
+next to this file:
+
+    uv run python compile_kernels.py
+
+detection.py loads the compiled module from this directory only, and only if
+its kernel_hash() matches the current source; otherwise (or if it is missing)
+it falls back to numba.njit, which compiles the kernel at import time instead.
+Re-run this script after changing detection._detect_scan.
+"""
+
+from pathlib import Path
+
+from numba.pycc import CC
+
+from detection import KERNEL_SIGNATURE, _detect_scan, kernel_hash
+
+KERNEL_HASH = kernel_hash()
+
+cc = CC('sprintzero_kernels')
+cc.output_dir = str(Path(__file__).parent)
+cc.export('detect_scan', KERNEL_SIGNATURE)(_detect_scan)
+
+
+@cc.export('kernel_hash', 'i8()')
+def _built_kernel_hash():
+    return KERNEL_HASH
+
+
+if __name__ == '__main__':
+    cc.compile()
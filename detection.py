@@ -17,38 +17,72 @@ When they disagree → the gap is the uncertainty zone.
 
 import json
 import base64
+import hashlib
+import importlib.machinery
+import importlib.util
+import inspect
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bottleneck as bn
 import numpy as np
-import pandas as pd
+from numba import njit
 from pathlib import Path
 
+from firestore_loader import accel_from_samples, sort_by_time
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
+
+log = logging.getLogger(__name__)
+
 # Agreement threshold: if forward and backward are within this many seconds,
 # they "agree" and we average them.
 AGREEMENT_THRESHOLD = 1.5  # seconds
 
 MIN_TIMES = {60: 3, 70: 4, 100: 5, 200: 15, 290: 25, 400: 40}
+_MIN_TIME_DISTANCES = np.array(sorted(MIN_TIMES))
+_MIN_TIME_VALUES = np.array([MIN_TIMES[d] for d in _MIN_TIME_DISTANCES], dtype=np.float64)
+
+# Terminal plots can't show more detail than this; longer curves are thinned.
+MAX_PLOT_POINTS = 1000
 
 
 # =============================================================================
 # Data loading
 # =============================================================================
 
+def _json_loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def decode_curve(encoded_data):
-    return json.loads(base64.b64decode(encoded_data))
+    return _json_loads(base64.b64decode(encoded_data))
+
+
+def _record_samples(records):
+    """(n, 4) float64 timestamp/x/y/z array from {timestamp, x, y, z} records."""
+    return np.array(
+        [(r['timestamp'], r['x'], r['y'], r['z']) for r in records], dtype=np.float64,
+    ).reshape(-1, 4)
+
+
+def accel_arrays(records):
+    """Sort {timestamp, x, y, z} records by time into t/mag ndarrays."""
+    return accel_from_samples(_record_samples(records))
 
 
 def load_sprint_data(sprint):
     result = {}
     if 'accelerationCurve' in sprint:
-        accel = pd.DataFrame(decode_curve(sprint['accelerationCurve']))
-        accel = accel.rename(columns={'x': 'accel_x', 'y': 'accel_y', 'z': 'accel_z'})
-        accel = accel.sort_values('timestamp').reset_index(drop=True)
-        accel['mag'] = np.sqrt(accel['accel_x']**2 + accel['accel_y']**2 + accel['accel_z']**2)
-        result['accel'] = accel
+        result['accel'] = accel_arrays(decode_curve(sprint['accelerationCurve']))
     if 'gyroscopeCurve' in sprint:
-        gyro = pd.DataFrame(decode_curve(sprint['gyroscopeCurve']))
-        gyro = gyro.rename(columns={'x': 'gyro_x', 'y': 'gyro_y', 'z': 'gyro_z'})
-        gyro = gyro.sort_values('timestamp').reset_index(drop=True)
-        result['gyro'] = gyro
+        t, x, y, z = np.ascontiguousarray(sort_by_time(_record_samples(decode_curve(sprint['gyroscopeCurve']))).T)
+        result['gyro'] = {'t': t, 'x': x, 'y': y, 'z': z}
     return result
 
 
@@ -70,12 +104,12 @@ def get_sprints_with_curves(data):
 # Common: rolling mean + sprint level
 # =============================================================================
 
-def compute_rolling_mean(accel_df, window_seconds=1.0):
-    t = accel_df['timestamp'].values
-    mag = accel_df['mag'].values
-    rate = len(accel_df) / (t[-1] - t[0])
+def compute_rolling_mean(accel, window_seconds=1.0):
+    t = accel['t']
+    mag = accel['mag']
+    rate = len(t) / (t[-1] - t[0])
     window = max(10, int(window_seconds * rate))
-    rolling = pd.Series(mag).rolling(window=window, min_periods=5).mean().values
+    rolling = bn.move_mean(mag, window=window, min_count=5)
     return rolling, rate
 
 
@@ -83,59 +117,127 @@ def find_sprint_level(t, rolling):
     duration = t[-1] - t[0]
     mid_start = t[0] + duration * 0.2
     mid_end = t[0] + duration * 0.7
-    mid_mask = (t >= mid_start) & (t <= mid_end) & ~np.isnan(rolling)
-    if mid_mask.sum() < 10:
+    # t is sorted, so the middle segment is a contiguous slice.
+    i0 = np.searchsorted(t, mid_start, side='left')
+    i1 = np.searchsorted(t, mid_end, side='right')
+    seg = rolling[i0:i1]
+    if np.count_nonzero(~np.isnan(seg)) < 10:
         return 5.0
-    return np.median(rolling[mid_mask])
+    return float(np.nanmedian(seg))
 
 
 def find_sprint_start(t, rolling):
-    for i in range(len(rolling)):
-        if not np.isnan(rolling[i]) and rolling[i] > 2.0:
-            return t[i], i
-    return t[0], 0
+    above = (rolling > 2.0) & ~np.isnan(rolling)
+    if not above.any():
+        return t[0], 0
+    i = int(np.argmax(above))
+    return t[i], i
 
 
 # =============================================================================
-# FORWARD detection
+# FORWARD + BACKWARD detection (one fused pass over the rolling mean)
 # =============================================================================
 
-def detect_forward(t, rolling, sprint_level, min_sprint_time=5.0):
+def _detect_scan(t, rolling, threshold, search_start_idx, sustain_samples):
+    """Forward and backward hit indices from a single scan, -1 where there is none.
+
+    Forward: first sample at/after search_start_idx that drops below threshold
+    with no sample back at/above it within the next sustain_samples (the window
+    is cut short at the end of the recording).
+    Backward: last sample at/above threshold.
+    """
+    n = len(t)
+    forward = -1
+    backward = -1
+    candidate = -1
+    for i in range(n):
+        x = rolling[i]
+        if x == x:
+            if x >= threshold:
+                backward = i
+                candidate = -1
+            elif forward < 0 and candidate < 0 and i >= search_start_idx:
+                candidate = i
+        if forward < 0 and candidate >= 0 and i - candidate + 1 >= sustain_samples:
+            forward = candidate
+    if forward < 0:
+        forward = candidate
+    return forward, backward
+
+
+# compile_kernels.py builds _detect_scan ahead of time with this signature.
+# Without a current build, fall back to the JIT and compile it here at import
+# for the same types, so the first sprint never waits on LLVM.
+KERNEL_SIGNATURE = 'UniTuple(i8, 2)(f8[:], f4[:], f8, i8, i8)'
+
+
+def kernel_hash():
+    """Fingerprint of the kernel source + signature, baked into the AOT build."""
+    digest = hashlib.sha256((inspect.getsource(_detect_scan) + KERNEL_SIGNATURE).encode()).hexdigest()
+    return int(digest[:15], 16)  # fits in an i8
+
+
+def _load_aot_kernel():
+    """detect_scan from the sprintzero_kernels build next to this file, or None if missing or stale."""
+    here = Path(__file__).resolve().parent
+    for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+        path = here / f'sprintzero_kernels{suffix}'
+        if path.exists():
+            break
+    else:
+        return None
+
+    try:
+        spec = importlib.util.spec_from_file_location('sprintzero_kernels', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except ImportError:
+        log.warning("Could not load %s, using the JIT kernel", path.name)
+        return None
+
+    built_hash = getattr(module, 'kernel_hash', None)
+    if built_hash is None or built_hash() != kernel_hash():
+        log.warning("%s is stale (re-run compile_kernels.py), using the JIT kernel", path.name)
+        return None
+    return module.detect_scan
+
+
+_detect_kernel = _load_aot_kernel()
+if _detect_kernel is not None:
+    log.info("Detection kernel: AOT build (holds the GIL, so sprint threads don't overlap the scan)")
+else:
+    _detect_kernel = njit(cache=True, nogil=True)(_detect_scan)
+    _detect_kernel(np.zeros(2), np.zeros(2, dtype=np.float32), 0.0, 0, 1)
+    log.info("Detection kernel: numba JIT (nogil)")
+
+
+def detect_both(t, rolling, sprint_level, min_sprint_time=5.0):
+    """Run forward and backward detection together.
+
+    Returns (forward_time, backward_time, threshold).
+    """
     threshold = sprint_level * 0.90
-    search_start = t[0] + min_sprint_time
+    search_start_idx = int(np.searchsorted(t, t[0] + min_sprint_time))
     rate = len(t) / (t[-1] - t[0])
     sustain_samples = max(5, int(0.5 * rate))
 
-    for i in range(len(t)):
-        if t[i] < search_start:
-            continue
-        if np.isnan(rolling[i]):
-            continue
-        if rolling[i] < threshold:
-            sustained = True
-            end_check = min(i + sustain_samples, len(t))
-            for j in range(i, end_check):
-                if not np.isnan(rolling[j]) and rolling[j] >= threshold:
-                    sustained = False
-                    break
-            if sustained:
-                return t[i], threshold
+    fwd, bwd = _detect_kernel(
+        t.astype(np.float64, copy=False), rolling.astype(np.float32, copy=False),
+        threshold, search_start_idx, sustain_samples,
+    )
+    forward_time = t[fwd] if fwd >= 0 else t[-1]
+    backward_time = t[bwd] if bwd >= 0 else t[0]
+    return forward_time, backward_time, threshold
 
-    return t[-1], threshold
 
+def detect_forward(t, rolling, sprint_level, min_sprint_time=5.0):
+    forward_time, _, threshold = detect_both(t, rolling, sprint_level, min_sprint_time)
+    return forward_time, threshold
 
-# =============================================================================
-# BACKWARD detection
-# =============================================================================
 
 def detect_backward(t, rolling, sprint_level):
-    threshold = sprint_level * 0.90
-    for i in range(len(t) - 1, -1, -1):
-        if np.isnan(rolling[i]):
-            continue
-        if rolling[i] >= threshold:
-            return t[i], threshold
-    return t[0], threshold
+    _, backward_time, threshold = detect_both(t, rolling, sprint_level)
+    return backward_time, threshold
 
 
 # =============================================================================
@@ -156,29 +258,41 @@ def decide(forward_time, backward_time, sprint_start):
 # High-level: analyze a file
 # =============================================================================
 
-def _analyze_sprint(accel_df, distance, date, index):
-    """Run bidirectional detection on a single sprint's acceleration DataFrame.
+def min_time_for_distance(distance):
+    """Minimum sprint time of the longest MIN_TIMES distance not exceeding `distance`."""
+    i = int(np.searchsorted(_MIN_TIME_DISTANCES, distance, side='right')) - 1
+    return float(_MIN_TIME_VALUES[max(i, 0)])
+
+
+def _analyze_sprint(accel, distance, date, index):
+    """Run bidirectional detection on a single sprint's acceleration arrays.
 
+    `accel` is a dict with time-sorted 't' and 'mag' ndarrays (see accel_arrays).
     Returns a result dict or None if insufficient data.
     """
-    if accel_df is None or len(accel_df) < 100:
+    if accel is None or len(accel['t']) < 100:
         return None
 
-    t = accel_df['timestamp'].values
-    rolling, rate = compute_rolling_mean(accel_df)
+    t = accel['t']
+    rolling, rate = compute_rolling_mean(accel)
     sprint_level = find_sprint_level(t, rolling)
     sprint_start, _ = find_sprint_start(t, rolling)
 
-    min_time = MIN_TIMES.get(distance, 5)
+    min_time = min_time_for_distance(distance)
 
-    fwd_time, fwd_thresh = detect_forward(t, rolling, sprint_level, min_sprint_time=min_time)
-    bwd_time, _ = detect_backward(t, rolling, sprint_level)
+    fwd_time, bwd_time, fwd_thresh = detect_both(t, rolling, sprint_level, min_sprint_time=min_time)
     final_time, decision, gap = decide(fwd_time, bwd_time, sprint_start)
 
     fwd_dur = fwd_time - sprint_start
     bwd_dur = bwd_time - sprint_start
     final_dur = final_time - sprint_start
 
+    t_rel = t - sprint_start
+    step = max(1, len(t) // MAX_PLOT_POINTS)
+    t_plot = t_rel[::step]
+    r_plot = rolling[::step]
+    valid = ~np.isnan(r_plot)
+
     return {
         'index': index,
         'date': date,
@@ -189,8 +303,10 @@ def _analyze_sprint(accel_df, distance, date, index):
         'gap': gap,
         'decision': decision,
         'plot_data': {
-            't': t - sprint_start,
+            't': t_rel,
             'rolling': rolling,
+            't_list': t_plot[valid].tolist(),
+            'r_list': r_plot[valid].tolist(),
             'sprint_level': sprint_level,
             'threshold': fwd_thresh,
             'fwd_time': fwd_dur,
@@ -204,24 +320,31 @@ def analyze_file(path):
     """
     Analyze a .falcata file. Returns a list of result dicts, each containing:
       - index, date, distance, fwd_dur, bwd_dur, final_dur, gap, decision
-      - plot_data: dict with t, rolling, sprint_level, threshold, sprint_start,
+      - plot_data: dict with t, rolling, t_list/r_list (thinned, NaN-free plot series),
+                   sprint_level, threshold, sprint_start,
                    fwd_time, bwd_time, final_time (for charting)
     """
-    with open(path, 'r') as f:
-        data = json.load(f)
+    data = _json_loads(Path(path).read_bytes())
 
     sprints = get_sprints_with_curves(data)
     sprints = [s for s in sprints if s['distance'] >= 60]
 
-    results = []
-    for i, sprint_info in enumerate(sprints):
-        sprint = sprint_info['sprint']
-        loaded = load_sprint_data(sprint)
-        r = _analyze_sprint(loaded.get('accel'), sprint_info['distance'], sprint_info['date'], i + 1)
-        if r is not None:
-            results.append(r)
+    def analyze(numbered):
+        i, sprint_info = numbered
+        loaded = load_sprint_data(sprint_info['sprint'])
+        return _analyze_sprint(loaded.get('accel'), sprint_info['distance'], sprint_info['date'], i + 1)
 
-    return results
+    # Sprints are independent. Only the numpy/bottleneck array work (and the
+    # JIT kernel, which is built nogil; the AOT export is not) can overlap
+    # across threads. JSON decoding and building the sample arrays hold the
+    # GIL and run serially, so don't expect the decode path to scale.
+    if len(sprints) > 1:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(executor.map(analyze, enumerate(sprints)))
+    else:
+        results = [analyze(numbered) for numbered in enumerate(sprints)]
+
+    return [r for r in results if r is not None]
 
 
 def analyze_firestore_sessions(sessions):
@@ -240,8 +363,8 @@ def analyze_firestore_sessions(sessions):
         for sprint_info in session_to_sprints(session):
             if sprint_info['distance'] < 60:
                 continue
-            accel_df = sprint_info['loaded'].get('accel')
-            r = _analyze_sprint(accel_df, sprint_info['distance'], sprint_info['date'], idx)
+            accel = sprint_info['loaded'].get('accel')
+            r = _analyze_sprint(accel, sprint_info['distance'], sprint_info['date'], idx)
             if r is not None:
                 results.append(r)
                 idx += 1
@@ -2,7 +2,7 @@
 Firestore data loader for Falcata Analyzer.
 
 Fetches sprint sessions from the `debug_sessions` Firestore collection
-and decodes CompactCurvePayload binary blobs into acceleration/gyroscope DataFrames.
+and decodes CompactCurvePayload binary blobs into acceleration/gyroscope ndarrays.
 
 Authentication:
   Uses Application Default Credentials (run `gcloud auth application-default login`).
@@ -12,10 +12,14 @@ Authentication:
 import struct
 import zlib
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import numpy as np
-import pandas as pd
-from google.cloud import firestore
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime: google-cloud-firestore pulls in grpc/protobuf/auth,
+    # which is a noticeable startup cost for users who only analyze local files.
+    from google.cloud import firestore
 
 # Path to shared secrets (sibling repo)
 _XCCONFIG_PATH = Path(__file__).parent / "../FalcataProject/Falcata/Falcata/Secrets.xcconfig"
@@ -42,7 +46,8 @@ def decode_compact_curve_payload(compressed_data: bytes) -> dict:
     """Decompress zlib + parse the v3 binary layout.
 
     Returns dict with keys: acceleration, gyroscope, smoothed_acceleration, cycle_amplitudes.
-    Each curve entry is a list of dicts: {timestamp, x, y, z}.
+    Each curve entry is a (count, 4) float32 ndarray with columns: timestamp, x, y, z;
+    cycle_amplitudes is a float32 ndarray.
     """
     data = zlib.decompress(compressed_data, -15)  # raw deflate (Apple Compression framework)
     if len(data) < 9:
@@ -58,59 +63,78 @@ def decode_compact_curve_payload(compressed_data: bytes) -> dict:
     if version >= 3:
         smoothed_count = struct.unpack_from("<H", data, 5)[0]
         cycle_count = struct.unpack_from("<H", data, 7)[0]
-        offset = 9
+        header_size = 9
     else:
         smoothed_count = 0
         cycle_count = 0
-        offset = 5
+        header_size = 5
+
+    # Sections are packed back to back: 16 bytes per sample (4 x float32), 4 per amplitude.
+    accel_offset = header_size
+    gyro_offset = accel_offset + accel_count * 16
+    smoothed_offset = gyro_offset + gyro_count * 16
+    cycle_offset = smoothed_offset + smoothed_count * 16
+
+    accel_raw = np.frombuffer(data, dtype="<f4", count=accel_count * 4, offset=accel_offset).reshape(-1, 4)
+    gyro_raw = np.frombuffer(data, dtype="<f4", count=gyro_count * 4, offset=gyro_offset).reshape(-1, 4)
+    if smoothed_count > 0:
+        smoothed_raw = np.frombuffer(data, dtype="<f4", count=smoothed_count * 4, offset=smoothed_offset).reshape(-1, 4)
+    else:
+        smoothed_raw = np.empty((0, 4), dtype="<f4")
+    cycle_amplitudes = np.frombuffer(data, dtype="<f4", count=cycle_count, offset=cycle_offset).copy()
+
+    return {
+        "acceleration": accel_raw,
+        "gyroscope": gyro_raw,
+        "smoothed_acceleration": smoothed_raw,
+        "cycle_amplitudes": cycle_amplitudes,
+    }
+
+
+# Shared with detection.py, which builds the same structures from .falcata records.
+
+def magnitude(samples: np.ndarray) -> np.ndarray:
+    """Per-row float32 vector magnitude of the x/y/z columns of a (count, 4) sample array."""
+    # Sensor values only carry ~16 bits, so float32 magnitudes lose nothing.
+    xyz = samples[:, 1:].astype(np.float32, copy=False)
+    return np.sqrt(np.einsum("ij,ij->i", xyz, xyz, dtype=np.float32))
 
-    def read_samples(count):
-        nonlocal offset
-        samples = np.frombuffer(data, dtype="<f4", count=count * 4, offset=offset).reshape(count, 4)
-        offset += count * 16
+
+def sort_by_time(samples: np.ndarray) -> np.ndarray:
+    """Stable-sort a (count, 4) sample array by timestamp; already-sorted input is returned as is."""
+    ts = samples[:, 0]
+    if np.all(ts[1:] >= ts[:-1]):
         return samples
+    return samples[np.argsort(ts, kind="stable")]
 
-    accel_raw = read_samples(accel_count)
-    gyro_raw = read_samples(gyro_count)
-    smoothed_raw = read_samples(smoothed_count) if smoothed_count > 0 else np.empty((0, 4))
-    cycle_amplitudes = list(np.frombuffer(data, dtype="<f4", count=cycle_count, offset=offset))
-    offset += cycle_count * 4
 
-    def to_records(arr):
-        return [{"timestamp": float(r[0]), "x": float(r[1]), "y": float(r[2]), "z": float(r[3])} for r in arr]
+def accel_from_samples(samples: np.ndarray) -> dict:
+    """Time-sorted float64 t and float32 mag ndarrays from a (count, 4) sample array."""
+    samples = sort_by_time(samples)
+    return {"t": samples[:, 0].astype(np.float64), "mag": magnitude(samples)}
 
-    return {
-        "acceleration": to_records(accel_raw),
-        "gyroscope": to_records(gyro_raw),
-        "smoothed_acceleration": to_records(smoothed_raw),
-        "cycle_amplitudes": cycle_amplitudes,
-    }
 
+def curve_payload_to_arrays(compressed_data: bytes) -> dict:
+    """Decode CompactCurvePayload into the time-sorted ndarrays the analyzer consumes.
 
-def curve_payload_to_dataframes(compressed_data: bytes) -> dict:
-    """Decode CompactCurvePayload and return pandas DataFrames ready for the analyzer."""
+    accel is a dict with t/mag (see accel_from_samples), gyro has t/x/y/z
+    and smoothed has t/x/y/z/mag.
+    """
     decoded = decode_compact_curve_payload(compressed_data)
 
     result = {}
-    if decoded["acceleration"]:
-        accel = pd.DataFrame(decoded["acceleration"])
-        accel = accel.rename(columns={"x": "accel_x", "y": "accel_y", "z": "accel_z"})
-        accel = accel.sort_values("timestamp").reset_index(drop=True)
-        accel["mag"] = np.sqrt(accel["accel_x"] ** 2 + accel["accel_y"] ** 2 + accel["accel_z"] ** 2)
-        result["accel"] = accel
-
-    if decoded["gyroscope"]:
-        gyro = pd.DataFrame(decoded["gyroscope"])
-        gyro = gyro.rename(columns={"x": "gyro_x", "y": "gyro_y", "z": "gyro_z"})
-        gyro = gyro.sort_values("timestamp").reset_index(drop=True)
-        result["gyro"] = gyro
-
-    if decoded["smoothed_acceleration"]:
-        smoothed = pd.DataFrame(decoded["smoothed_acceleration"])
-        smoothed = smoothed.rename(columns={"x": "accel_x", "y": "accel_y", "z": "accel_z"})
-        smoothed = smoothed.sort_values("timestamp").reset_index(drop=True)
-        smoothed["mag"] = np.sqrt(smoothed["accel_x"] ** 2 + smoothed["accel_y"] ** 2 + smoothed["accel_z"] ** 2)
-        result["smoothed"] = smoothed
+    if len(decoded["acceleration"]):
+        result["accel"] = accel_from_samples(decoded["acceleration"])
+
+    # The transposed copies are contiguous per column and detached from the payload buffer.
+    if len(decoded["gyroscope"]):
+        t, x, y, z = np.ascontiguousarray(sort_by_time(decoded["gyroscope"]).T)
+        result["gyro"] = {"t": t, "x": x, "y": y, "z": z}
+
+    if len(decoded["smoothed_acceleration"]):
+        smoothed_raw = sort_by_time(decoded["smoothed_acceleration"])
+        t, x, y, z = np.ascontiguousarray(smoothed_raw.T)
+        result["smoothed"] = {"t": t, "x": x, "y": y, "z": z, "mag": magnitude(smoothed_raw)}
 
     result["cycle_amplitudes"] = decoded["cycle_amplitudes"]
     return result
@@ -123,7 +147,7 @@ def curve_payload_to_dataframes(compressed_data: bytes) -> dict:
 _db = None
 
 
-def get_db() -> firestore.Client:
+def get_db() -> "firestore.Client":
     """Get or create the Firestore client.
 
     Reads project ID from Secrets.xcconfig and uses Application Default Credentials.
@@ -133,6 +157,8 @@ def get_db() -> firestore.Client:
     if _db is not None:
         return _db
 
+    from google.cloud import firestore
+
     config = _parse_xcconfig(_XCCONFIG_PATH.resolve())
     project_id = config.get("FIREBASE_PROJECT_ID")
     if not project_id:
@@ -147,6 +173,8 @@ def fetch_sessions(limit: int = 100) -> list[dict]:
 
     Returns list of dicts, each with the raw Firestore document fields.
     """
+    from google.cloud import firestore
+
     db = get_db()
     query = (
         db.collection("debug_sessions")
@@ -160,7 +188,7 @@ def session_to_sprints(session: dict) -> list[dict]:
     """Convert a Firestore session document into a list of sprint dicts
     compatible with the analyzer.
 
-    Each returned dict has: date, distance, accel (DataFrame), gyro (DataFrame).
+    Each returned dict has: date, distance, meta, and loaded (see curve_payload_to_arrays).
     """
     curves = session.get("curves", {})
     sprint_metas = session.get("sprints", [])
@@ -186,7 +214,7 @@ def session_to_sprints(session: dict) -> list[dict]:
 
         if curve_blob is not None:
             raw = curve_blob if isinstance(curve_blob, bytes) else bytes(curve_blob)
-            sprint_info["loaded"] = curve_payload_to_dataframes(raw)
+            sprint_info["loaded"] = curve_payload_to_arrays(raw)
 
         results.append(sprint_info)
 